@@ -5,180 +5,473 @@ Injects test conditions to trigger specific alerts
 """
 
 import argparse
+import functools
+import gzip
 import json
+import logging
+import re
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import sys
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # optional speedup; the stdlib decoder returns the same structures
+    _json_loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+# A prepared push: (group URL, payload, extra request headers)
+_Push = Tuple[str, bytes, Optional[Dict[str, str]]]
+
+# Default upper bound on in-flight pushes (and pooled Pushgateway connections)
+PUSH_WORKERS = 8
+# Seconds between pushes, measured from the start of each push
+PUSH_INTERVAL = 15
+# (connect, read) timeouts in seconds, so a hung endpoint cannot stall a loop
+HTTP_TIMEOUT = (3.05, 10)
+# Exposition text is highly repetitive, so the fastest gzip level compresses nearly as well
+GZIP_LEVEL = 1
+USER_AGENT = "alert-injector/1.0"
+_GZIP_HEADERS = {"Content-Encoding": "gzip"}
+# Pushgateway job for per-service groups, and a separate job for multi-service
+# batches so the two never push the same series identity from different groups
+PUSH_JOB = "alert_test"
+BATCH_JOB = "alert_test_batch"
+# Consecutive failed push cycles after which an injection run gives up
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+def _build_session(pool_maxsize: int = 4) -> requests.Session:
+    """Create a keep-alive session with a small pool and retries on gateway errors"""
+    session = requests.Session()
+    session.headers.update({"User-Agent": USER_AGENT, "Connection": "keep-alive"})
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(total=3, backoff_factor=0.5,
+                          status_forcelist=[502, 503, 504],
+                          # Pushgateway pushes replace the group, so POST is safe to retry
+                          allowed_methods=frozenset({"GET", "POST", "PUT", "DELETE"}),
+                          raise_on_status=False)
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Metric families as (TYPE line, per-service series template) pairs. Templates are
+# bytes so payloads are built without an extra str -> bytes encode.
+_ERROR_TMPL = (
+    (b"# TYPE http_requests_total counter",
+     b'http_requests_total{service="%(service)b",instance="%(service)b",status="200"} 100\n'
+     b'http_requests_total{service="%(service)b",instance="%(service)b",status="500"} 150'),
+    (b"# TYPE http_request_duration_seconds histogram",
+     b'http_request_duration_seconds_bucket{service="%(service)b",instance="%(service)b",le="0.1"} 50\n'
+     b'http_request_duration_seconds_bucket{service="%(service)b",instance="%(service)b",le="0.5"} 100\n'
+     b'http_request_duration_seconds_bucket{service="%(service)b",instance="%(service)b",le="1.0"} 200\n'
+     b'http_request_duration_seconds_bucket{service="%(service)b",instance="%(service)b",le="+Inf"} 250\n'
+     b'http_request_duration_seconds_sum{service="%(service)b",instance="%(service)b"} 125.5\n'
+     b'http_request_duration_seconds_count{service="%(service)b",instance="%(service)b"} 250'),
+)
+
+_LATENCY_TMPL = (
+    (b"# TYPE http_request_duration_seconds histogram",
+     b'http_request_duration_seconds_bucket{service="%(service)b",instance="%(service)b",le="0.1"} 10\n'
+     b'http_request_duration_seconds_bucket{service="%(service)b",instance="%(service)b",le="0.5"} 20\n'
+     b'http_request_duration_seconds_bucket{service="%(service)b",instance="%(service)b",le="1.0"} 30\n'
+     b'http_request_duration_seconds_bucket{service="%(service)b",instance="%(service)b",le="2.0"} 40\n'
+     b'http_request_duration_seconds_bucket{service="%(service)b",instance="%(service)b",le="5.0"} 80\n'
+     b'http_request_duration_seconds_bucket{service="%(service)b",instance="%(service)b",le="+Inf"} 100\n'
+     b'http_request_duration_seconds_sum{service="%(service)b",instance="%(service)b"} %(latency_sum).1f\n'
+     b'http_request_duration_seconds_count{service="%(service)b",instance="%(service)b"} 100'),
+)
+
+_MEM_TMPL = (
+    (b"# TYPE container_memory_usage_bytes gauge",
+     b'container_memory_usage_bytes{container="%(service)b",instance="%(service)b"} %(usage)d'),
+    (b"# TYPE container_spec_memory_limit_bytes gauge",
+     b'container_spec_memory_limit_bytes{container="%(service)b",instance="%(service)b"} %(limit)d'),
+)
+
+_CPU_TMPL = (
+    (b"# TYPE container_cpu_usage_seconds_total counter",
+     b'container_cpu_usage_seconds_total{container="%(service)b",instance="%(service)b"} %(usage)d'),
+    (b"# TYPE container_spec_cpu_quota gauge",
+     b'container_spec_cpu_quota{container="%(service)b",instance="%(service)b"} %(limit)d'),
+)
+
+# Resource type -> (template, usage percent -> usage value multiplier, limit value)
+_RESOURCE_TMPLS = {
+    "memory": (_MEM_TMPL, 10**7, 100 * 10**7),
+    "cpu": (_CPU_TMPL, 1000, 100000),
+}
+
+
+def _as_services(services) -> List[str]:
+    """Normalize a service name or list of names, defaulting to test-service
+
+    Duplicates are dropped, since repeated series in one push are rejected.
+    """
+    if isinstance(services, str):
+        return [services]
+    return list(dict.fromkeys(services or ["test-service"]))
+
+
+def _validate_label(value: str) -> bytes:
+    """Encode a label value for the bytes templates, rejecting characters that need escaping"""
+    if any(char in value for char in '"\\\n'):
+        raise ValueError(f"Invalid label value {value!r}: quotes, backslashes and newlines are not allowed")
+    try:
+        return value.encode("ascii")
+    except UnicodeEncodeError:
+        raise ValueError(f"Invalid label value {value!r}: must be ASCII") from None
+
+
+def _render_exposition(families: Tuple[Tuple[bytes, bytes], ...], services: List[str],
+                       **values) -> bytes:
+    """Render metric families for every service as one text-format payload
+
+    The series template is repeated per service so that each family keeps a
+    single TYPE line.
+    """
+    mapping = {key.encode("ascii"): value for key, value in values.items()}
+    labels = [_validate_label(service) for service in services]
+
+    lines = []
+    for type_line, series in families:
+        lines.append(type_line)
+        for label in labels:
+            mapping[b"service"] = label
+            lines.append(series % mapping)
+    return b"\n".join(lines) + b"\n"
+
+
+def _read_body(response: requests.Response) -> Union[bytes, bytearray]:
+    """Read a streamed response body, into a pre-sized buffer when its length is known"""
+    length = response.headers.get("Content-Length")
+    if length is None or response.headers.get("Content-Encoding"):
+        return response.content
+
+    buffer = bytearray(int(length))
+    view = memoryview(buffer)
+    received = 0
+
+    while received < len(buffer):
+        chunk = response.raw.readinto(view[received:])
+        if not chunk:
+            break
+        received += chunk
+
+    return buffer if received == len(buffer) else buffer[:received]
+
+
+def _quote_matcher(value: str) -> str:
+    """Quote a value for an AlertManager label matcher, escaping backslashes and quotes"""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+class TokenBucket:
+    """Thread-safe token bucket that smooths bursts of Pushgateway writes"""
+
+    def __init__(self, capacity: float, refill_per_sec: float):
+        if capacity < 1 or refill_per_sec <= 0:
+            raise ValueError("capacity must be >= 1 and refill_per_sec > 0")
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.tokens: float = float(capacity)
+        self.last_refill: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        """Take one token, waiting up to timeout seconds. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.last_refill) * self.refill_per_sec)
+                self.last_refill = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+
+                wait = (1 - self.tokens) / self.refill_per_sec
+
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
 
 class AlertInjector:
     """Injects test conditions to trigger alerts"""
 
     def __init__(self, prometheus_url: str = "http://prometheus:9090",
-                 pushgateway_url: str = "http://pushgateway:9091"):
+                 pushgateway_url: str = "http://pushgateway:9091",
+                 max_concurrent: int = PUSH_WORKERS,
+                 rate_limit: float = 10.0,
+                 queue_timeout: float = 5.0,
+                 compress: bool = True):
         self.prometheus_url = prometheus_url
         self.pushgateway_url = pushgateway_url
-
-    def inject_high_error_rate(self, service: str = "test-service",
-                               duration_minutes: int = 5):
-        """Inject metrics showing high error rate"""
-        print(f"Injecting high error rate for {service} (duration: {duration_minutes}min)")
-
-        # Calculate start/end times
-        start_time = time.time()
-        end_time = start_time + (duration_minutes * 60)
+        self.compress = compress
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.dropped_pushes = 0
+        self._bucket = TokenBucket(capacity=max_concurrent, refill_per_sec=rate_limit)
+        self._dropped_lock = threading.Lock()
+        self.session = _build_session(pool_maxsize=max_concurrent)
+        self.session.headers["Content-Type"] = "text/plain"
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Log progress every N successful push cycles rather than on each one
+        self._log_every = 10
+
+    def close(self):
+        """Close pooled connections to the Pushgateway"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _log_progress(self, metrics_injected: int):
+        """Log a progress line every _log_every successful push cycles"""
+        if metrics_injected % self._log_every == 0:
+            logger.info("✓ Metrics injected (%d batches)", metrics_injected)
+
+    def _push_groups(self, services: List[str],
+                     per_instance: bool = False) -> List[Tuple[str, List[str]]]:
+        """Return the Pushgateway group URLs for services and the services in each
+
+        A single service, or any services with per_instance, gets its own
+        PUSH_JOB/instance/{service} group so separate injectors never overwrite
+        each other. Only an explicit multi-service batch shares one group, under
+        BATCH_JOB with the service carried in the `instance` label; the distinct
+        job keeps its series from colliding with the per-service groups.
+        """
+        if per_instance or len(services) == 1:
+            return [(f"{self.pushgateway_url}/metrics/job/{PUSH_JOB}/instance/{service}",
+                     [service])
+                    for service in services]
+
+        return [(f"{self.pushgateway_url}/metrics/job/{BATCH_JOB}", services)]
+
+    def _prepare_pushes(self, families: Tuple[Tuple[bytes, bytes], ...],
+                        services: List[str], per_instance: bool = False,
+                        **values) -> List[_Push]:
+        """Build the (url, payload, headers) triples for one push cycle
+
+        Payloads are gzip-compressed here, once, unless compression is disabled;
+        compressed payloads carry their own Content-Encoding header.
+        """
+        pushes = [(url, _render_exposition(families, group_services, **values), None)
+                  for url, group_services in self._push_groups(services, per_instance)]
+
+        if self.compress:
+            pushes = [(url, gzip.compress(payload, compresslevel=GZIP_LEVEL), _GZIP_HEADERS)
+                      for url, payload, _ in pushes]
+        return pushes
+
+    def _push(self, pushes: List[_Push]) -> List[Optional[int]]:
+        """Send prepared pushes, returning the response status codes
+
+        Multiple pushes are issued concurrently over the shared session, at most
+        max_concurrent at a time. Every
+        push first takes a token from the rate limiter; a push that cannot get
+        one within queue_timeout is dropped and reported as None.
+        """
+        def push_one(push: _Push) -> Optional[int]:
+            url, payload, headers = push
+
+            if not self._bucket.acquire(timeout=self.queue_timeout):
+                with self._dropped_lock:
+                    self.dropped_pushes += 1
+                    dropped = self.dropped_pushes
+                logger.warning("✗ Push to %s dropped by rate limiter (%d dropped so far)", url, dropped)
+                return None
+
+            with self.session.post(url, data=payload, headers=headers,
+                                   timeout=HTTP_TIMEOUT, stream=True) as response:
+                # Discard the unread body so the connection returns to the pool
+                response.raw.drain_conn()
+                return response.status_code
+
+        if len(pushes) == 1:
+            return [push_one(pushes[0])]
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
+        return list(self._executor.map(push_one, pushes))
+
+    def _push_loop(self, pushes: List[_Push],
+                   duration_minutes: float) -> Optional[int]:
+        """Send prepared pushes every PUSH_INTERVAL seconds until the duration elapses
+
+        Connection errors and timeouts are retried with backoff by the session;
+        a cycle that still fails is skipped, and the run is aborted after
+        MAX_CONSECUTIVE_FAILURES failed cycles in a row. Client errors other
+        than 429 mean the payload itself was rejected and abort immediately.
+
+        Returns the number of fully successful push cycles, or None if the run
+        was aborted or never pushed successfully. A run that ends on fewer than
+        MAX_CONSECUTIVE_FAILURES failed cycles still succeeds, since Pushgateway
+        keeps serving the last successful push.
+        """
+        # Monotonic deadline so wall-clock jumps can't shorten or extend the run
+        next_tick = time.monotonic()
+        deadline = next_tick + (duration_minutes * 60)
 
         metrics_injected = 0
+        consecutive_failures = 0
 
-        while time.time() < end_time:
-            # Inject error metrics
-            metrics = f"""
-# TYPE http_requests_total counter
-http_requests_total{{service="{service}",status="200"}} 100
-http_requests_total{{service="{service}",status="500"}} 150
-
-# TYPE http_request_duration_seconds histogram
-http_request_duration_seconds_bucket{{service="{service}",le="0.1"}} 50
-http_request_duration_seconds_bucket{{service="{service}",le="0.5"}} 100
-http_request_duration_seconds_bucket{{service="{service}",le="1.0"}} 200
-http_request_duration_seconds_bucket{{service="{service}",le="+Inf"}} 250
-http_request_duration_seconds_sum{{service="{service}"}} 125.5
-http_request_duration_seconds_count{{service="{service}"}} 250
-"""
-
+        while time.monotonic() < deadline:
             try:
-                response = requests.post(
-                    f"{self.pushgateway_url}/metrics/job/alert_test/instance/{service}",
-                    data=metrics,
-                    headers={"Content-Type": "text/plain"}
-                )
-
-                if response.status_code in [200, 202]:
-                    metrics_injected += 1
-                    print(f"✓ Metrics injected ({metrics_injected})", end="\r")
-                else:
-                    print(f"\n✗ Failed to inject metrics: {response.status_code}")
-
-            except Exception as e:
-                print(f"\n✗ Error injecting metrics: {e}")
-                return False
+                statuses = self._push(pushes)
+                failed = [status for status in statuses if status not in [200, 202]]
+            except requests.RequestException as e:
+                failed = [e]
+
+            if not failed:
+                consecutive_failures = 0
+                metrics_injected += 1
+                self._log_progress(metrics_injected)
+            else:
+                rejected = [status for status in failed
+                            if isinstance(status, int) and 400 <= status < 500 and status != 429]
+                if rejected:
+                    logger.error("✗ Pushgateway rejected metrics: %s", rejected[0])
+                    return None
+
+                consecutive_failures += 1
+                logger.warning("✗ Failed to inject metrics (%d/%d): %s", consecutive_failures,
+                               MAX_CONSECUTIVE_FAILURES, failed[0] or "dropped")
+
+                if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                    logger.error("✗ Giving up after %d consecutive failures", consecutive_failures)
+                    return None
+
+            # Schedule from the previous tick so slow pushes don't stretch the cadence,
+            # skipping ticks a slow cycle overran: a push replaces its group, so
+            # catching up would only burst identical pushes at the gateway
+            next_tick += PUSH_INTERVAL
+            now = time.monotonic()
+            while next_tick <= now:
+                next_tick += PUSH_INTERVAL
+            time.sleep(max(0.0, min(next_tick, deadline) - now))
+
+        if metrics_injected == 0:
+            logger.error("✗ No metric batches were injected")
+            return None
+
+        if consecutive_failures:
+            logger.warning("✗ Run ended after %d failed push cycle(s); last successful push remains",
+                           consecutive_failures)
+
+        return metrics_injected
+
+    def inject_high_error_rate(self, services: Union[str, List[str], None] = None,
+                               duration_minutes: int = 5,
+                               per_instance: bool = False):
+        """Inject metrics showing high error rate"""
+        services = _as_services(services)
+        logger.info("Injecting high error rate for %s (duration: %smin)",
+                    ", ".join(services), duration_minutes)
+
+        # Payloads are fixed for the whole run, so render them once up front
+        pushes = self._prepare_pushes(_ERROR_TMPL, services, per_instance)
 
-            time.sleep(15)  # Inject every 15 seconds
+        metrics_injected = self._push_loop(pushes, duration_minutes)
+        if metrics_injected is None:
+            return False
 
-        print(f"\n✓ Injected {metrics_injected} metric batches")
+        logger.info("✓ Injected %d metric batches", metrics_injected)
         return True
 
-    def inject_high_latency(self, service: str = "test-service",
+    def inject_high_latency(self, services: Union[str, List[str], None] = None,
                            latency_ms: int = 2000,
-                           duration_minutes: int = 5):
+                           duration_minutes: int = 5,
+                           per_instance: bool = False):
         """Inject metrics showing high latency"""
-        print(f"Injecting high latency for {service} ({latency_ms}ms, duration: {duration_minutes}min)")
-
-        start_time = time.time()
-        end_time = start_time + (duration_minutes * 60)
-
-        while time.time() < end_time:
-            # Create histogram buckets for high latency
-            metrics = f"""
-# TYPE http_request_duration_seconds histogram
-http_request_duration_seconds_bucket{{service="{service}",le="0.1"}} 10
-http_request_duration_seconds_bucket{{service="{service}",le="0.5"}} 20
-http_request_duration_seconds_bucket{{service="{service}",le="1.0"}} 30
-http_request_duration_seconds_bucket{{service="{service}",le="2.0"}} 40
-http_request_duration_seconds_bucket{{service="{service}",le="5.0"}} 80
-http_request_duration_seconds_bucket{{service="{service}",le="+Inf"}} 100
-http_request_duration_seconds_sum{{service="{service}"}} {latency_ms / 1000 * 100}
-http_request_duration_seconds_count{{service="{service}"}} 100
-"""
+        services = _as_services(services)
+        logger.info("Injecting high latency for %s (%sms, duration: %smin)",
+                    ", ".join(services), latency_ms, duration_minutes)
 
-            try:
-                response = requests.post(
-                    f"{self.pushgateway_url}/metrics/job/alert_test/instance/{service}",
-                    data=metrics
-                )
-
-                if response.status_code in [200, 202]:
-                    print("✓ Metrics injected", end="\r")
-                else:
-                    print(f"\n✗ Failed: {response.status_code}")
-
-            except Exception as e:
-                print(f"\n✗ Error: {e}")
-                return False
+        pushes = self._prepare_pushes(_LATENCY_TMPL, services, per_instance,
+                                      latency_sum=latency_ms / 1000 * 100)
 
-            time.sleep(15)
+        metrics_injected = self._push_loop(pushes, duration_minutes)
+        if metrics_injected is None:
+            return False
 
-        print("\n✓ Latency metrics injection complete")
+        logger.info("✓ Latency metrics injection complete (%d batches)", metrics_injected)
         return True
 
-    def inject_resource_exhaustion(self, service: str = "test-service",
+    def inject_resource_exhaustion(self, services: Union[str, List[str], None] = None,
                                    resource_type: str = "memory",
                                    usage_percent: int = 95,
-                                   duration_minutes: int = 5):
+                                   duration_minutes: int = 5,
+                                   per_instance: bool = False):
         """Inject metrics showing resource exhaustion"""
-        print(f"Injecting {resource_type} exhaustion for {service} ({usage_percent}%, duration: {duration_minutes}min)")
+        services = _as_services(services)
+        logger.info("Injecting %s exhaustion for %s (%s%%, duration: %smin)",
+                    resource_type, ", ".join(services), usage_percent, duration_minutes)
 
-        start_time = time.time()
-        end_time = start_time + (duration_minutes * 60)
-
-        while time.time() < end_time:
-            if resource_type == "memory":
-                metrics = f"""
-# TYPE container_memory_usage_bytes gauge
-container_memory_usage_bytes{{container="{service}"}} {usage_percent * 10**7}
-
-# TYPE container_spec_memory_limit_bytes gauge
-container_spec_memory_limit_bytes{{container="{service}"}} {100 * 10**7}
-"""
-            elif resource_type == "cpu":
-                metrics = f"""
-# TYPE container_cpu_usage_seconds_total counter
-container_cpu_usage_seconds_total{{container="{service}"}} {usage_percent * 1000}
-
-# TYPE container_spec_cpu_quota gauge
-container_spec_cpu_quota{{container="{service}"}} {100000}
-"""
-            else:
-                print(f"✗ Unknown resource type: {resource_type}")
-                return False
-
-            try:
-                response = requests.post(
-                    f"{self.pushgateway_url}/metrics/job/alert_test/instance/{service}",
-                    data=metrics
-                )
-
-                if response.status_code in [200, 202]:
-                    print("✓ Metrics injected", end="\r")
+        resource = _RESOURCE_TMPLS.get(resource_type)
+        if resource is None:
+            logger.error("✗ Unknown resource type: %s", resource_type)
+            return False
 
-            except Exception as e:
-                print(f"\n✗ Error: {e}")
-                return False
+        template, usage_scale, limit = resource
+        pushes = self._prepare_pushes(template, services, per_instance,
+                                      usage=usage_percent * usage_scale, limit=limit)
 
-            time.sleep(15)
+        metrics_injected = self._push_loop(pushes, duration_minutes)
+        if metrics_injected is None:
+            return False
 
-        print("\n✓ Resource exhaustion metrics injection complete")
+        logger.info("✓ Resource exhaustion metrics injection complete (%d batches)",
+                    metrics_injected)
         return True
 
-    def clear_injected_metrics(self, service: str = "test-service"):
+    def clear_injected_metrics(self, services: Union[str, List[str], None] = None,
+                               per_instance: bool = False):
         """Clear injected test metrics"""
-        print(f"Clearing injected metrics for {service}...")
+        services = _as_services(services)
+        logger.info("Clearing injected metrics for %s...", ", ".join(services))
+
+        # Delete exactly the groups an injection with the same arguments pushed to
+        urls = [url for url, _ in self._push_groups(services, per_instance)]
 
         try:
-            response = requests.delete(
-                f"{self.pushgateway_url}/metrics/job/alert_test/instance/{service}"
-            )
+            for url in urls:
+                with self.session.delete(url, timeout=HTTP_TIMEOUT, stream=True) as response:
+                    response.raw.drain_conn()
+                    status = response.status_code
 
-            if response.status_code in [200, 202]:
-                print("✓ Metrics cleared")
-                return True
-            else:
-                print(f"✗ Failed to clear metrics: {response.status_code}")
-                return False
+                if status not in [200, 202]:
+                    logger.error("✗ Failed to clear metrics: %s", status)
+                    return False
+
+            logger.info("✓ Metrics cleared")
+            return True
 
         except Exception as e:
-            print(f"✗ Error clearing metrics: {e}")
+            logger.error("✗ Error clearing metrics: %s", e)
             return False
 
 
@@ -187,89 +480,213 @@ class AlertVerifier:
 
     def __init__(self, alertmanager_url: str = "http://alertmanager:9093"):
         self.alertmanager_url = alertmanager_url
+        self.session = _build_session()
+        # (fetched at, raw alerts, active alerts by name) keyed by AlertManager filter,
+        # reused for _cache_ttl seconds
+        self._alerts_cache: Dict[Optional[str],
+                                 Tuple[float, List[Dict], Dict[str, List[Dict]]]] = {}
+        self._cache_ttl = 2.0
+
+    def close(self):
+        """Close pooled connections to AlertManager"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def wait_for_alert(self, alert_name: str, timeout: int = 180) -> bool:
         """Wait for specific alert to fire"""
-        print(f"Waiting for alert '{alert_name}' to fire (timeout: {timeout}s)...")
+        logger.info("Waiting for alert '%s' to fire (timeout: %ss)...", alert_name, timeout)
 
-        start_time = time.time()
+        start_time = time.monotonic()
+        delay = 1.0
 
-        while time.time() - start_time < timeout:
-            alerts = self.get_active_alerts()
+        while time.monotonic() - start_time < timeout:
+            _, index = self._fetch_alerts(alert_name, force=True)
 
-            for alert in alerts:
-                if alert.get('labels', {}).get('alertname') == alert_name:
-                    elapsed = int(time.time() - start_time)
-                    print(f"✓ Alert '{alert_name}' fired after {elapsed}s")
-                    return True
+            if alert_name in index:
+                elapsed = int(time.monotonic() - start_time)
+                logger.info("✓ Alert '%s' fired after %ds", alert_name, elapsed)
+                return True
 
-            print(".", end="", flush=True)
-            time.sleep(5)
+            # Poll quickly at first, then back off while the alert's `for` duration elapses
+            remaining = timeout - (time.monotonic() - start_time)
+            logger.debug("Alert '%s' not firing yet, polling again in %.1fs", alert_name, delay)
+            time.sleep(max(0.0, min(delay, remaining)))
+            delay = min(delay * 1.5, 10.0)
 
-        print(f"\n✗ Alert '{alert_name}' did not fire within {timeout}s")
+        logger.error("✗ Alert '%s' did not fire within %ss", alert_name, timeout)
         return False
 
-    def get_active_alerts(self) -> List[Dict]:
-        """Get list of currently active alerts"""
+    def wait_for_alerts(self, names: Union[str, Iterable[str]],
+                        timeout: int = 180) -> Dict[str, bool]:
+        """Wait for several alerts to fire, returning whether each one did
+
+        All names are checked off a single AlertManager query per poll, using a
+        regex filter on alertname.
+        """
+        if isinstance(names, str):
+            names = [names]
+        names = list(dict.fromkeys(names))
+        pending = set(names)
+        alert_filter = f'alertname=~{_quote_matcher("|".join(map(re.escape, names)))}'
+        logger.info("Waiting for alerts %s to fire (timeout: %ss)...", ", ".join(names), timeout)
+
+        start_time = time.monotonic()
+        delay = 1.0
+
+        while pending and time.monotonic() - start_time < timeout:
+            _, index = self._query_alerts(alert_filter, force=True)
+
+            fired = pending & index.keys()
+            if fired:
+                elapsed = int(time.monotonic() - start_time)
+                for name in sorted(fired):
+                    logger.info("✓ Alert '%s' fired after %ds", name, elapsed)
+                pending -= fired
+
+            if pending:
+                remaining = timeout - (time.monotonic() - start_time)
+                logger.debug("%d alert(s) not firing yet, polling again in %.1fs",
+                             len(pending), delay)
+                time.sleep(max(0.0, min(delay, remaining)))
+                delay = min(delay * 1.5, 10.0)
+
+        for name in names:
+            if name in pending:
+                logger.error("✗ Alert '%s' did not fire within %ss", name, timeout)
+
+        return {name: name not in pending for name in names}
+
+    @staticmethod
+    def _index_by_name(alerts: List[Dict]) -> Dict[str, List[Dict]]:
+        """Group active alerts by alertname"""
+        index: Dict[str, List[Dict]] = {}
+        for alert in alerts:
+            if alert.get('status', {}).get('state') == 'active':
+                index.setdefault(alert.get('labels', {}).get('alertname'), []).append(alert)
+        return index
+
+    def _fetch_alerts(self, alert_name: Optional[str] = None, force: bool = False
+                      ) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+        """Return the raw alert list and its active-alert index, optionally for one alertname"""
+        return self._query_alerts(f'alertname={_quote_matcher(alert_name)}' if alert_name else None,
+                                  force)
+
+    def _query_alerts(self, alert_filter: Optional[str] = None, force: bool = False
+                      ) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+        """Return the raw alert list and its active-alert index for an AlertManager filter
+
+        The filter is applied by AlertManager, so only matching alerts are sent
+        back and parsed. Responses are reused for a couple of seconds so
+        back-to-back verifications share one request; pass force to refetch.
+        """
+        cached = self._alerts_cache.get(alert_filter)
+
+        if not force and cached and time.monotonic() - cached[0] < self._cache_ttl:
+            return cached[1], cached[2]
+
+        params = {"filter": alert_filter} if alert_filter else None
+
         try:
-            response = requests.get(f"{self.alertmanager_url}/api/v2/alerts")
-            response.raise_for_status()
+            with self.session.get(f"{self.alertmanager_url}/api/v2/alerts",
+                                  params=params, timeout=HTTP_TIMEOUT,
+                                  stream=True) as response:
+                response.raise_for_status()
 
-            alerts = response.json()
-            return [a for a in alerts if a.get('status', {}).get('state') == 'active']
+                alerts = _json_loads(_read_body(response))
 
         except Exception as e:
-            print(f"✗ Error fetching alerts: {e}")
-            return []
+            logger.error("✗ Error fetching alerts: %s", e)
+            return [], {}
+
+        index = self._index_by_name(alerts)
+        self._alerts_cache[alert_filter] = (time.monotonic(), alerts, index)
+        return alerts, index
+
+    def get_active_alerts(self, alert_name: Optional[str] = None,
+                          force: bool = False) -> Iterator[Dict]:
+        """Iterate currently active alerts, optionally only those named alert_name"""
+        alerts, _ = self._fetch_alerts(alert_name, force)
+        return (a for a in alerts if a.get('status', {}).get('state') == 'active')
 
     def verify_alert_labels(self, alert_name: str,
                            expected_labels: Dict[str, str]) -> bool:
         """Verify alert has expected labels"""
-        print(f"Verifying labels for alert '{alert_name}'...")
+        logger.info("Verifying labels for alert '%s'...", alert_name)
 
-        alerts = self.get_active_alerts()
+        _, index = self._fetch_alerts(alert_name)
+        matches = index.get(alert_name)
 
-        for alert in alerts:
-            if alert.get('labels', {}).get('alertname') == alert_name:
-                labels = alert.get('labels', {})
+        if not matches:
+            logger.error("✗ Alert '%s' not found", alert_name)
+            return False
 
-                for key, expected_value in expected_labels.items():
-                    actual_value = labels.get(key)
+        labels = matches[0].get('labels', {})
 
-                    if actual_value != expected_value:
-                        print(f"✗ Label mismatch: {key}={actual_value}, expected {expected_value}")
-                        return False
+        for key, expected_value in expected_labels.items():
+            actual_value = labels.get(key)
 
-                print("✓ All labels verified")
-                return True
+            if actual_value != expected_value:
+                logger.error("✗ Label mismatch: %s=%s, expected %s", key, actual_value, expected_value)
+                return False
 
-        print(f"✗ Alert '{alert_name}' not found")
-        return False
+        logger.info("✓ All labels verified")
+        return True
 
     def verify_alert_annotations(self, alert_name: str,
                                 required_annotations: List[str]) -> bool:
         """Verify alert has required annotations"""
-        print(f"Verifying annotations for alert '{alert_name}'...")
+        logger.info("Verifying annotations for alert '%s'...", alert_name)
 
-        alerts = self.get_active_alerts()
+        _, index = self._fetch_alerts(alert_name)
+        matches = index.get(alert_name)
 
-        for alert in alerts:
-            if alert.get('labels', {}).get('alertname') == alert_name:
-                annotations = alert.get('annotations', {})
+        if not matches:
+            logger.error("✗ Alert '%s' not found", alert_name)
+            return False
 
-                for annotation in required_annotations:
-                    if annotation not in annotations:
-                        print(f"✗ Missing annotation: {annotation}")
-                        return False
+        annotations = matches[0].get('annotations', {})
 
-                print("✓ All annotations present")
-                return True
+        for annotation in required_annotations:
+            if annotation not in annotations:
+                logger.error("✗ Missing annotation: %s", annotation)
+                return False
 
-        print(f"✗ Alert '{alert_name}' not found")
-        return False
+        logger.info("✓ All annotations present")
+        return True
+
+
+def _positive_int(value: str) -> int:
+    """argparse type for integers >= 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def _positive_float(value: str) -> float:
+    """argparse type for numbers > 0"""
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def _non_negative_float(value: str) -> float:
+    """argparse type for numbers >= 0"""
+    number = float(value)
+    if not number >= 0:
+        raise argparse.ArgumentTypeError(f"must not be negative, got {value}")
+    return number
 
 
-def main():
+@functools.lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the CLI parser once per process; parse_args leaves it unchanged"""
     parser = argparse.ArgumentParser(description="Alert Test Data Injector")
     parser.add_argument('--prometheus-url', default='http://prometheus:9090',
                        help='Prometheus URL')
@@ -277,22 +694,34 @@ def main():
                        help='Pushgateway URL')
     parser.add_argument('--alertmanager-url', default='http://alertmanager:9093',
                        help='AlertManager URL')
+    parser.add_argument('--max-concurrent', type=_positive_int, default=PUSH_WORKERS,
+                       help='Maximum in-flight (and burst of) Pushgateway writes')
+    parser.add_argument('--rate-limit', type=_positive_float, default=10.0,
+                       help='Sustained Pushgateway writes per second')
+    parser.add_argument('--queue-timeout', type=_non_negative_float, default=5.0,
+                       help='Seconds a push may wait for the rate limiter before being dropped')
+    parser.add_argument('--no-gzip', dest='compress', action='store_false',
+                       help='Send uncompressed pushes (for Pushgateways without gzip support)')
 
     subparsers = parser.add_subparsers(dest='command', help='Command to execute')
 
     # Inject high error rate
     inject_error = subparsers.add_parser('inject-error-rate',
                                          help='Inject high error rate')
-    inject_error.add_argument('--service', default='test-service',
-                             help='Service name')
+    inject_error.add_argument('--service', dest='services', nargs='+',
+                             default=['test-service'], help='Service name(s)')
+    inject_error.add_argument('--per-instance', action='store_true',
+                             help='Push each service to its own instance group')
     inject_error.add_argument('--duration', type=int, default=5,
                              help='Duration in minutes')
 
     # Inject high latency
     inject_latency = subparsers.add_parser('inject-latency',
                                            help='Inject high latency')
-    inject_latency.add_argument('--service', default='test-service',
-                               help='Service name')
+    inject_latency.add_argument('--service', dest='services', nargs='+',
+                               default=['test-service'], help='Service name(s)')
+    inject_latency.add_argument('--per-instance', action='store_true',
+                               help='Push each service to its own instance group')
     inject_latency.add_argument('--latency', type=int, default=2000,
                                help='Latency in milliseconds')
     inject_latency.add_argument('--duration', type=int, default=5,
@@ -301,8 +730,10 @@ def main():
     # Inject resource exhaustion
     inject_resource = subparsers.add_parser('inject-resource-exhaustion',
                                            help='Inject resource exhaustion')
-    inject_resource.add_argument('--service', default='test-service',
-                                help='Service name')
+    inject_resource.add_argument('--service', dest='services', nargs='+',
+                                default=['test-service'], help='Service name(s)')
+    inject_resource.add_argument('--per-instance', action='store_true',
+                                help='Push each service to its own instance group')
     inject_resource.add_argument('--resource', choices=['memory', 'cpu'],
                                 default='memory', help='Resource type')
     inject_resource.add_argument('--usage', type=int, default=95,
@@ -312,7 +743,10 @@ def main():
 
     # Clear metrics
     clear = subparsers.add_parser('clear', help='Clear injected metrics')
-    clear.add_argument('--service', default='test-service', help='Service name')
+    clear.add_argument('--service', dest='services', nargs='+',
+                       default=['test-service'], help='Service name(s)')
+    clear.add_argument('--per-instance', action='store_true',
+                       help='Clear per-instance groups of a multi-service batch')
 
     # Wait for alert
     wait = subparsers.add_parser('wait-for-alert',
@@ -321,38 +755,66 @@ def main():
     wait.add_argument('--timeout', type=int, default=180,
                      help='Timeout in seconds')
 
-    args = parser.parse_args()
+    # Wait for several alerts
+    wait_many = subparsers.add_parser('wait-for-alerts',
+                                      help='Wait for several alerts to fire')
+    wait_many.add_argument('alert_names', nargs='+', help='Alert names')
+    wait_many.add_argument('--timeout', type=int, default=180,
+                          help='Timeout in seconds')
+
+    return parser
+
+
+# Command name -> handler(args, injector, verifier) returning success
+COMMANDS: Dict[str, Callable[[argparse.Namespace, AlertInjector, AlertVerifier], bool]] = {
+    'inject-error-rate': lambda args, injector, verifier: injector.inject_high_error_rate(
+        args.services, args.duration, args.per_instance),
+    'inject-latency': lambda args, injector, verifier: injector.inject_high_latency(
+        args.services, args.latency, args.duration, args.per_instance),
+    'inject-resource-exhaustion': lambda args, injector, verifier: injector.inject_resource_exhaustion(
+        args.services, args.resource, args.usage, args.duration, args.per_instance),
+    'clear': lambda args, injector, verifier: injector.clear_injected_metrics(
+        args.services, args.per_instance),
+    'wait-for-alert': lambda args, injector, verifier: verifier.wait_for_alert(
+        args.alert_name, args.timeout),
+    'wait-for-alerts': lambda args, injector, verifier: all(verifier.wait_for_alerts(
+        args.alert_names, args.timeout).values()),
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
 
     if not args.command:
         parser.print_help()
         return 1
 
-    injector = AlertInjector(args.prometheus_url, args.pushgateway_url)
+    command = COMMANDS.get(args.command)
+    if command is None:
+        logger.error("Unknown command: %s", args.command)
+        return 1
+
+    injector = AlertInjector(args.prometheus_url, args.pushgateway_url,
+                             args.max_concurrent, args.rate_limit, args.queue_timeout,
+                             args.compress)
     verifier = AlertVerifier(args.alertmanager_url)
 
     try:
-        if args.command == 'inject-error-rate':
-            success = injector.inject_high_error_rate(args.service, args.duration)
-        elif args.command == 'inject-latency':
-            success = injector.inject_high_latency(args.service, args.latency, args.duration)
-        elif args.command == 'inject-resource-exhaustion':
-            success = injector.inject_resource_exhaustion(args.service, args.resource, args.usage, args.duration)
-        elif args.command == 'clear':
-            success = injector.clear_injected_metrics(args.service)
-        elif args.command == 'wait-for-alert':
-            success = verifier.wait_for_alert(args.alert_name, args.timeout)
-        else:
-            print(f"Unknown command: {args.command}")
-            return 1
-
+        success = command(args, injector, verifier)
         return 0 if success else 1
 
     except KeyboardInterrupt:
-        print("\n\n✗ Interrupted by user")
+        logger.error("✗ Interrupted by user")
         return 130
     except Exception as e:
-        print(f"\n✗ Error: {e}")
+        logger.error("✗ Error: %s", e)
         return 1
+    finally:
+        injector.close()
+        verifier.close()
 
 
 if __name__ == '__main__':